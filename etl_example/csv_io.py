@@ -0,0 +1,202 @@
+import os
+import sys
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_compute
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_compute = None
+    pa_csv = None
+
+'''Shared CSV read/write backend for every pipeline stage.
+
+- Reads with the multi-threaded pyarrow CSV engine, all columns typed as strings
+- Falls back to the plain pandas engine when pyarrow is missing or fails to parse a file
+- Writes with the multi-threaded pyarrow CSV writer, formatting values the way to_csv does
+- Backend can be forced with the ETL_CSV_BACKEND environment variable ("pyarrow" or "pandas")
+- Running this file prints a read/write throughput benchmark (MB/s) per backend'''
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BACKENDS = ["pyarrow", "pandas"]
+DEFAULT_BACKEND = os.environ.get("ETL_CSV_BACKEND", "pyarrow")
+
+# Same tokens pandas turns into NaN by default, so both backends agree on missing values.
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def resolve_backend(backend=None):
+    '''Return the backend to use, falling back to pandas when pyarrow is unavailable.'''
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown CSV backend: {backend}. Expected one of {BACKENDS}")
+    if backend == "pyarrow" and pa_csv is None:
+        return "pandas"
+    return backend
+
+
+def _read_csv_pyarrow(file_path, encoding):
+    # Header is parsed by pandas so column naming ('Unnamed: N', duplicate
+    # suffixes) stays identical to the pandas engine; raises EmptyDataError too.
+    columns = list(pd.read_csv(file_path, nrows=0, encoding=encoding).columns)
+
+    # No skip_rows: pandas skips blank lines before the header and so does pyarrow,
+    # so the header line is always pyarrow's first row and is dropped below.
+    read_options = pa_csv.ReadOptions(
+        column_names=columns,
+        use_threads=True,
+        encoding=encoding,
+    )
+    convert_options = pa_csv.ConvertOptions(
+        column_types={col: pa.string() for col in columns},
+        null_values=NA_VALUES,
+        strings_can_be_null=True,
+    )
+    table = pa_csv.read_csv(file_path, read_options=read_options, convert_options=convert_options)
+    return table.slice(1).to_pandas()
+
+
+def read_csv(file_path, encoding="utf-8", backend=None):
+    '''
+    Load CSV with every column as string (same result as pd.read_csv(..., dtype=str)).
+    Uses pyarrow multi-threaded parsing when available, otherwise pandas.
+    '''
+    if resolve_backend(backend) == "pyarrow":
+        try:
+            return _read_csv_pyarrow(file_path, encoding)
+        except pa.ArrowInvalid as e:
+            print(f"pyarrow could not parse {file_path} ({e}), falling back to pandas")
+
+    return pd.read_csv(file_path, dtype=str, encoding=encoding)
+
+
+def _arrow_column(series):
+    '''Convert one column to an Arrow array whose CSV text matches DataFrame.to_csv.'''
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.dropna()
+        if (values == values.dt.normalize()).all():
+            return pa.array(series.dt.date, type=pa.date32(), from_pandas=True)
+        seconds = pa.array(series, from_pandas=True).cast(pa.timestamp("s"), safe=False)
+        return pa_compute.strftime(seconds, format="%Y-%m-%d %H:%M:%S")
+
+    if pd.api.types.is_float_dtype(series):
+        # Arrow prints 80.0 as "80", pandas as "80.0".
+        text = pa_compute.cast(pa.array(series, from_pandas=True), pa.string())
+        whole = pa_compute.match_substring_regex(text, r"^-?\d+$")
+        return pa_compute.if_else(whole, pa_compute.binary_join_element_wise(text, ".0", ""), text)
+
+    if pd.api.types.is_integer_dtype(series):
+        return pa.array(series, from_pandas=True)
+
+    if pd.api.types.is_bool_dtype(series):
+        return pa.array(series.map({True: "True", False: "False"}), type=pa.string(), from_pandas=True)
+
+    try:
+        return pa.array(series, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Mixed object column (numbers and strings, datetimes): to_csv writes str() of each value.
+        text = series.astype(str).where(series.notna(), None)
+        return pa.array(text, type=pa.string(), from_pandas=True)
+
+
+def _write_csv_pyarrow(df, output_path):
+    names = ["" if col is None else str(col) for col in df.columns]
+    arrays = [_arrow_column(df.iloc[:, i]) for i in range(df.shape[1])]
+    table = pa.Table.from_arrays(arrays, names=names)
+
+    # Arrow has no minimal quoting: "needed" quotes every string cell. When no cell contains a
+    # delimiter, quote or line break, write unquoted so the file matches to_csv byte for byte.
+    needs_quotes = any(
+        pa.types.is_string(array.type)
+        and pa_compute.any(pa_compute.match_substring_regex(pa_compute.unique(array), r'[",\r\n]')).as_py()
+        for array in arrays
+    )
+    quoting_style = "needed" if needs_quotes else "none"
+
+    # Arrow always quotes header names, so the header line comes from pandas.
+    header = pd.DataFrame(columns=df.columns).to_csv(index=False, lineterminator="\n")
+    write_options = pa_csv.WriteOptions(include_header=False, quoting_style=quoting_style)
+    with open(output_path, "wb") as f:
+        f.write(header.encode("utf-8"))
+        pa_csv.write_csv(table, f, write_options=write_options)
+
+
+def write_csv(df, output_path, encoding="utf-8", backend=None):
+    '''
+    Save DataFrame to CSV without index, always with "\n" line endings.
+    The pyarrow backend formats each column like to_csv does and hands serialization to the
+    multi-threaded Arrow writer; the pandas backend is a single to_csv call. Output is the same
+    unless a value needs quoting, then Arrow quotes every string cell (same values when read back).
+    Non UTF-8 encodings and frames Arrow cannot convert go through pandas.
+    The file is written next to output_path and renamed into place, so readers never see a partial file.
+    '''
+    tmp_path = f"{output_path}.tmp"
+
+    use_pyarrow = (
+        resolve_backend(backend) == "pyarrow"
+        and encoding.lower().replace("-", "") == "utf8"
+        and df.shape[1] > 0
+    )
+    if use_pyarrow:
+        try:
+            _write_csv_pyarrow(df, tmp_path)
+            os.replace(tmp_path, output_path)
+            return
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            print(f"pyarrow could not write {output_path} ({e}), falling back to pandas")
+
+    df.to_csv(tmp_path, index=False, encoding=encoding, lineterminator="\n")
+    os.replace(tmp_path, output_path)
+
+
+def benchmark(file_path, repeats=3):
+    '''
+    Measure read and write throughput (MB/s) of each available backend on one CSV file.
+    Returns {backend: {"read_mb_s": float, "write_mb_s": float}}.
+    '''
+    size_mb = os.path.getsize(file_path) / (1024 * 1024)
+    tmp_path = f"{file_path}.bench.tmp"
+    results = {}
+
+    for backend in BACKENDS:
+        if resolve_backend(backend) != backend:
+            print(f"Backend {backend} not available, skipping")
+            continue
+
+        best_read = float("inf")
+        best_write = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            df = read_csv(file_path, backend=backend)
+            best_read = min(best_read, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            write_csv(df, tmp_path, backend=backend)
+            best_write = min(best_write, time.perf_counter() - start)
+
+        written_mb = os.path.getsize(tmp_path) / (1024 * 1024)
+        os.remove(tmp_path)
+
+        results[backend] = {
+            "read_mb_s": round(size_mb / best_read, 2),
+            "write_mb_s": round(written_mb / best_write, 2),
+        }
+
+    return results
+
+
+if __name__ == "__main__":
+    bench_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(BASE_DIR, "data", "full_data.csv")
+
+    print(f"Benchmarking CSV backends on {bench_file}")
+    for name, stats in benchmark(bench_file).items():
+        print(f"{name:>8}: read {stats['read_mb_s']} MB/s, write {stats['write_mb_s']} MB/s")
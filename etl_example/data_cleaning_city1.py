@@ -6,6 +6,10 @@ import glob
 from datetime import datetime, timedelta
 import unidecode
 
+from csv_io import read_csv, write_csv
+from temporal import parse_dates, parse_times, minutes_to_time, map_unique
+from data_quality import record_stage, stage_name, value_table
+
 DEFAULT_PRICES_City1 = {
     2018: "20E",
     2019: "20E",
@@ -174,6 +178,10 @@ def clean_source(text: str) -> str:
     return norm
 
 
+CASUAL_TIMES = ['12:00', '14:00', '16:00', '18:00', '20:00', '22:00']
+EARLY_SLOT = '10:00'
+
+
 def round_to_casual_time(time_obj):
     '''
     Round a time or datetime object to the nearest casual time.
@@ -182,8 +190,7 @@ def round_to_casual_time(time_obj):
     if time_obj is None:
         return None
 
-    casual_times = ['12:00', '14:00', '16:00', '18:00', '20:00', '22:00']
-    casual_dt = [datetime.strptime(t, '%H:%M').time() for t in casual_times]
+    casual_dt = [datetime.strptime(t, '%H:%M').time() for t in CASUAL_TIMES]
 
     if isinstance(time_obj, datetime):
         current_time = time_obj.time()
@@ -191,7 +198,7 @@ def round_to_casual_time(time_obj):
         current_time = time_obj
 
     if current_time < datetime.strptime('12:00', '%H:%M').time():
-        return '10:00'
+        return EARLY_SLOT
 
     min_diff = timedelta(hours=24)
     best_match = None
@@ -305,32 +312,41 @@ def normalize_text(text) -> str:
     )
     return text
 
+
+ROOM_ALIASES = {
+    "KV1": ["KV1A", "KV1B"],
+    "AV2": ["AV2A", "AV2B", "AV2C"],
+    "AS1": ["AS1A", "AS1B", "AS1C", "AS1D", "AS1E", "AS1F", "AS1G", "AS1H", "AS1I", "AS1J"],
+    "AS2": ["AS2A", "AS2B", "AS2C", "AS2D", "AS2E", "AS2F", "AS2G", "AS2H", "AS2I", "AS2J"],
+    "KS1": ["KS1A", "KS1B", "KS1C", "KS1D", "KS1E", "KS1F", "KS1G", "KS1H"],
+    "AS3": ["AS3A", "AS3B", "AS3C"],
+    "KV3": ["KV3A", "KV3B", "KV3C", "KV3D", "KV3E", "KV3F", "KV3G"],
+    "KS2": ["KS2A", "KS2B", "KS2C", "KS2D", "KS2E", "KS2F"],
+    "AS4": ["AS4A", "AS4B", "AS4C", "AS4D", "AS4E"],
+    "AV1": ["AV1A", "AV1B", "AV1C", "AV1D"],
+    "KV2": ["KV2A", "KV2B"],
+    "KS3": ["KS3A"]
+}
+
+
 def standardize_room(value) -> str:
     '''
     Map various room name aliases to standardized room names using extended mapping.
     '''
-    mapping = {
-        "KV1": ["KV1A", "KV1B"],
-        "AV2": ["AV2A", "AV2B", "AV2C"],
-        "AS1": ["AS1A", "AS1B", "AS1C", "AS1D", "AS1E", "AS1F", "AS1G", "AS1H", "AS1I", "AS1J"],
-        "AS2": ["AS2A", "AS2B", "AS2C", "AS2D", "AS2E", "AS2F", "AS2G", "AS2H", "AS2I", "AS2J"],
-        "KS1": ["KS1A", "KS1B", "KS1C", "KS1D", "KS1E", "KS1F", "KS1G", "KS1H"],
-        "AS3": ["AS3A", "AS3B", "AS3C"],
-        "KV3": ["KV3A", "KV3B", "KV3C", "KV3D", "KV3E", "KV3F", "KV3G"],
-        "KS2": ["KS2A", "KS2B", "KS2C", "KS2D", "KS2E", "KS2F"],
-        "AS4": ["AS4A", "AS4B", "AS4C", "AS4D", "AS4E"],
-        "AV1": ["AV1A", "AV1B", "AV1C", "AV1D"],
-        "KV2": ["KV2A", "KV2B"],
-        "KS3": ["KS3A"]
-    }
-
     normalized_value = normalize_text(value)
-    for standard_name, aliases in mapping.items():
+    for standard_name, aliases in ROOM_ALIASES.items():
         normalized_aliases = [normalize_text(alias) for alias in aliases]
         if normalized_value == normalize_text(standard_name) or normalized_value in normalized_aliases:
             return standard_name
     return None
 
+
+# Expected values per column for the data-quality report, anything else is reported as unmapped.
+KNOWN_VALUES = {
+    "Source": set(GROUP_KEYWORDS),
+    "Room Type": set(ROOM_ALIASES),
+}
+
 def filter_rooms(room_list):
     '''
     Filter and standardize rooms in a list, keeping only allowed rooms.
@@ -355,7 +371,7 @@ def process_file(input_path, output_path):
     file_year = int(year_match.group(1))
 
     try:
-        df = pd.read_csv(input_path, dtype=str)
+        df = read_csv(input_path)
         if df.empty:
             print(f"Skipping empty file: {input_path}")
             return
@@ -364,29 +380,33 @@ def process_file(input_path, output_path):
         return
 
     df.drop_duplicates(inplace=True)
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    events = {}
+    df['Date'] = parse_dates(df['Date']).dt.normalize()
+    events['invalid_date_rows_dropped'] = int(df['Date'].isna().sum())
     df = df.dropna(subset=['Date'])
+    events['other_year_rows_dropped'] = int((df['Date'].dt.year != file_year).sum())
     df = df[df['Date'].dt.year == file_year]
     if df.empty:
         print(f"No rows matching year {file_year} in file: {filename}. Skipping save.")
         return
-    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
 
     if 'Time' in df.columns:
         df['Time'] = df['Time'].fillna(method='ffill')
-        parsed = pd.to_datetime(df['Time'], format='%H:%M:%S', errors='coerce')
-        mask = parsed.isna()
-        if mask.any():
-            parsed.loc[mask] = pd.to_datetime(df.loc[mask, 'Time'], format='%H:%M', errors='coerce')
-        df['Time'] = parsed
-        bad = df['Time'].isna().sum()
+        minutes = parse_times(df['Time'])
+        bad = minutes.isna().sum()
+        events['invalid_time_rows_dropped'] = int(bad)
         if bad:
             print(f"Dropping {bad} rows with invalid 'Time'")
-            df = df.dropna(subset=['Time'])
-        df['Time'] = df['Time'].dt.time.apply(round_to_casual_time)
+            df = df[minutes.notna()]
+            minutes = minutes[minutes.notna()]
+        df['Time'] = map_unique(minutes, lambda m: round_to_casual_time(minutes_to_time(m)))
 
     if 'Room Type' in df.columns:
+        raw_rooms = df['Room Type']
         df['Room Type'] = df['Room Type'].apply(standardize_room)
+        unknown = df['Room Type'].isna() | df['Room Type'].isin(['', 'PETRAS'])
+        events['unknown_room_rows_dropped'] = int(unknown.sum())
+        events['unknown_rooms'] = value_table(raw_rooms[unknown])
         df = df[df['Room Type'].notna() & (df['Room Type'] != '')]
         df = df[~df['Room Type'].isin(['PETRAS'])]
 
@@ -420,6 +440,7 @@ def process_file(input_path, output_path):
         df['Status'] = df['Status'].apply(map_status)
 
     if 'Source' in df.columns:
+        events['blank_source_rows'] = int((df['Source'].isna() | (df['Source'].str.strip() == '')).sum())
         df['Source'] = df['Source'].fillna('INTERNETE').replace('', 'Internete')
         df['Source'] = df['Source'].apply(clean_source)
 
@@ -446,6 +467,7 @@ def process_file(input_path, output_path):
 
     row_age_values = df.apply(extract_row_ages, axis=1)
     df['Age Group'] = row_age_values.apply(lambda ages: categorize_age(ages[0]) if ages else "N/A")
+    events['age_group_room_fallback_rows'] = int((df['Age Group'] == "N/A").sum())
     df['Age Group'] = df.apply(fill_missing_age_group, axis=1)
     df['TeamType'] = df.apply(assign_team_type, axis=1)
 
@@ -457,7 +479,8 @@ def process_file(input_path, output_path):
     column_order = [col for col in column_order if col in df.columns]
     df = df.reindex(columns=column_order, fill_value='')
 
-    df.to_csv(output_path, index=False)
+    write_csv(df, output_path)
+    record_stage(df, stage_name(output_path), known_values=KNOWN_VALUES, events=events)
     print(f"Processed and saved: {output_path}")
 
 
@@ -490,12 +513,13 @@ def merge_cleaned_files(cleaned_folder, output_path):
 
     df_list = []
     for f in files:
-        df = pd.read_csv(f, dtype=str)
+        df = read_csv(f)
         df_list.append(df)
 
     merged_df = pd.concat(df_list, axis=0, ignore_index=True, sort=False)
 
-    merged_df.to_csv(output_path, index=False)
+    write_csv(merged_df, output_path)
+    record_stage(merged_df, stage_name(output_path), known_values=KNOWN_VALUES, events={"files_merged": len(files)})
     print(f"Merged all cleaned files into {output_path}")
 
 
@@ -1,6 +1,10 @@
 import os
 import pandas as pd
 
+from csv_io import read_csv, write_csv
+from temporal import parse_dates
+from data_quality import record_stage, stage_name
+
 '''This script merges multiple monthly CSV files into yearly datasets for each location.
 
 - Loads CSVs listed per year for each city/location
@@ -22,7 +26,7 @@ def read_csv_force_first_col_date(file_path):
         print(f"Missing file: {file_path}")
         return pd.DataFrame()
 
-    df = pd.read_csv(file_path, dtype=str, encoding="utf-8")
+    df = read_csv(file_path, encoding="utf-8")
 
     if df.empty:
         print(f"Empty file: {file_path}")
@@ -30,7 +34,7 @@ def read_csv_force_first_col_date(file_path):
 
     first_col = df.columns[0]
     df.rename(columns={first_col: "Date"}, inplace=True)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    df["Date"] = parse_dates(df["Date"])
 
     for col in df.columns:
         cleaned = col.lower().replace(" ", "")
@@ -65,10 +69,12 @@ def combine_yearly_csvs(input_dir, file_dict, output_dir):
         if combined:
             final_df = pd.concat(combined, ignore_index=True)
             final_df.drop_duplicates(inplace=True)
-            final_df.to_csv(output_file, index=False, encoding="utf-8")
+            write_csv(final_df, output_file, encoding="utf-8")
+            record_stage(final_df, stage_name(output_file), events={"missing_files": bad_files})
             print(f"Year {year}: saved {output_file}")
         else:
-            pd.DataFrame().to_csv(output_file, index=False, encoding="utf-8")
+            write_csv(pd.DataFrame(), output_file, encoding="utf-8")
+            record_stage(pd.DataFrame(), stage_name(output_file), events={"missing_files": bad_files})
             print(f"Year {year}: no data, created empty file")
 
         print(f"--- {year} Summary ---")
@@ -0,0 +1,178 @@
+import os
+import json
+from datetime import datetime
+
+import pandas as pd
+
+from temporal import parse_dates
+
+'''Data-quality metrics for every pipeline stage output.
+
+- One vectorized pass per DataFrame: null and fallback rates per column,
+  unmapped value frequency tables, price range violations and date coverage per month
+- Callers pass the known values for mapped columns (e.g. GROUP_KEYWORDS, room aliases)
+- Stage-specific events (dropped rows, missing files) are stored next to the metrics
+- All stages of one run are written into a single compact JSON report; a run is one process
+  unless ETL_RUN_ID is set, so several pipeline scripts can share a report'''
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(BASE_DIR, "data", "quality_reports")
+
+# Values the cleaning steps write when the raw value is missing or not recognised.
+# Source and Age Group are not listed: clean_source maps real online bookings to ONLINE too
+# and missing age groups are filled from the room, so the stages count them as events.
+FALLBACK_VALUES = {
+    "Escape Time": "-",
+    "EscapeTime": "-",
+    "Status": "Kita",
+    "Celebration": "Be šventės",
+}
+
+PRICE_COLUMNS = ["Revenue", "Price"]
+DATE_COLUMNS = ["Date", "Data"]
+
+# Same valid range clean_price_series_City1 accepts for a single booking.
+PRICE_RANGE = (30, 600)
+
+TOP_UNMAPPED = 20
+
+RUN_ID = os.environ.get("ETL_RUN_ID") or datetime.now().strftime("%Y%m%d-%H%M%S")
+
+
+def stage_name(output_path):
+    '''Stage key in the report: the output path relative to the project root.'''
+    return os.path.relpath(output_path, BASE_DIR).replace(os.sep, "/")
+
+
+def current_run_id():
+    '''Run id from ETL_RUN_ID, otherwise the start time of this process.'''
+    return RUN_ID
+
+
+def value_table(series, top=TOP_UNMAPPED):
+    '''Most frequent values of series as {value: count}, missing values counted as "NaN".'''
+    counts = series.value_counts(dropna=False).head(top)
+    return {"NaN" if pd.isna(k) else str(k): int(v) for k, v in counts.items()}
+
+
+def _unique_labels(columns):
+    '''Column labels as unique strings: blank headers become "", repeats get ".1", ".2" suffixes.'''
+    seen = {}
+    labels = []
+    for col in columns:
+        label = "" if col is None or (isinstance(col, float) and pd.isna(col)) else str(col)
+        if label in seen:
+            seen[label] += 1
+            label = f"{label}.{seen[label]}"
+        seen.setdefault(label, 0)
+        labels.append(label)
+    return labels
+
+
+def _price_metrics(series):
+    values = series.astype("string").str.replace("E", "", regex=False).str.strip()
+    present = values.notna() & (values != "")
+    prices = pd.to_numeric(values[present], errors="coerce")
+    low, high = PRICE_RANGE
+    return {
+        "column": series.name,
+        "non_numeric": int(prices.isna().sum()),
+        "below_range": int((prices < low).sum()),
+        "above_range": int((prices > high).sum()),
+        "min": None if prices.dropna().empty else float(prices.min()),
+        "max": None if prices.dropna().empty else float(prices.max()),
+    }
+
+
+def _date_coverage(series):
+    dates = series if pd.api.types.is_datetime64_any_dtype(series) else parse_dates(series)
+    dates = dates.dropna().dt.normalize()
+    if dates.empty:
+        return {}
+
+    months = dates.dt.to_period("M")
+    per_month = pd.DataFrame({"month": months, "day": dates}).groupby("month").agg(
+        rows=("day", "size"), days=("day", "nunique")
+    )
+    per_month["days_in_month"] = per_month.index.days_in_month
+    per_month["coverage"] = (per_month["days"] / per_month["days_in_month"]).round(4)
+
+    return {
+        str(month): {
+            "rows": int(row.rows),
+            "days": int(row.days),
+            "coverage": float(row.coverage),
+        }
+        for month, row in per_month.iterrows()
+    }
+
+
+def quality_metrics(df, known_values=None):
+    '''
+    Compute quality metrics for one stage output.
+    known_values maps a column to the set of expected values; anything else is counted as unmapped.
+    '''
+    known_values = known_values or {}
+    rows = len(df)
+
+    # Sheets with several blank header cells have duplicate labels, which would make
+    # df[col] return a frame instead of a column.
+    df = df.set_axis(_unique_labels(df.columns), axis=1)
+
+    text = df.astype("string")
+    blank = text.isna() | text.apply(lambda s: s.str.strip().eq(""))
+    null_rates = blank.mean() if rows else pd.Series(0.0, index=df.columns)
+
+    columns = {}
+    for col in df.columns:
+        stats = {"null_rate": round(float(null_rates[col]), 4)}
+        if col in FALLBACK_VALUES and rows:
+            stats["fallback_rate"] = round(float(text[col].eq(FALLBACK_VALUES[col]).mean()), 4)
+        columns[col] = stats
+
+    unmapped = {}
+    for col, known in known_values.items():
+        if col not in df.columns:
+            continue
+        values = text[col][~blank[col]]
+        values = values[~values.isin(list(known))]
+        unmapped[col] = {
+            "rows": int(len(values)),
+            "top": value_table(values),
+        }
+
+    price_col = next((c for c in PRICE_COLUMNS if c in df.columns), None)
+    date_col = next((c for c in DATE_COLUMNS if c in df.columns), None)
+
+    return {
+        "rows": rows,
+        "columns": columns,
+        "unmapped": unmapped,
+        "price": _price_metrics(df[price_col]) if price_col else None,
+        "date_coverage": _date_coverage(df[date_col]) if date_col else {},
+    }
+
+
+def record_stage(df, stage, known_values=None, events=None, run_id=None):
+    '''
+    Compute metrics for a stage output and merge them into this run's report file.
+    events holds stage-specific counters such as rows dropped or missing files.
+    '''
+    run_id = run_id or current_run_id()
+    report_path = os.path.join(REPORT_DIR, f"quality_{run_id}.json")
+    os.makedirs(REPORT_DIR, exist_ok=True)
+
+    report = {"run_id": run_id, "stages": {}}
+    if os.path.exists(report_path):
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+
+    metrics = quality_metrics(df, known_values)
+    metrics["events"] = events or {}
+    report["stages"][stage] = metrics
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, separators=(",", ":"))
+
+    return metrics
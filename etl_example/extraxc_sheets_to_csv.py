@@ -1,7 +1,17 @@
 import openpyxl
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string
 import pandas as pd
 import numpy as np
 import os
+import json
+import hashlib
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from csv_io import write_csv
+from data_quality import record_stage, stage_name
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -13,37 +23,157 @@ original_files = {
 price_col_name = "Revenue"
 col_name_info = "Source"
 
+MANIFEST_NAME = "_sheet_manifest.json"
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+
+def read_sheet_parts(xlsx_path):
+    '''
+    Read raw worksheet XML parts straight from the .xlsx zip, keyed by sheet name,
+    together with the shared strings table. Nothing is parsed with openpyxl here.
+    '''
+    with zipfile.ZipFile(xlsx_path) as zf:
+        workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{NS_PKG_REL}Relationship")}
+
+        parts = {}
+        for sheet in workbook.iter(f"{NS_MAIN}sheet"):
+            target = targets[sheet.get(f"{NS_REL}id")]
+            if target.startswith("/"):
+                part_name = target.lstrip("/")
+            else:
+                part_name = posixpath.normpath(posixpath.join("xl", target))
+            parts[sheet.get("name")] = zf.read(part_name)
+
+        shared_strings = []
+        if "xl/sharedStrings.xml" in zf.namelist():
+            for si in ET.fromstring(zf.read("xl/sharedStrings.xml")).iter(f"{NS_MAIN}si"):
+                shared_strings.append("".join(t.text or "" for t in si.iter(f"{NS_MAIN}t")))
+
+    return parts, shared_strings
+
+
+def parse_sheet_part(part):
+    '''
+    Return (merged range refs, shared string indices, max row, max column) of a worksheet XML part.
+    The bounds come from the cells themselves, not the <dimension> element, which may be stale.
+    Parsed with ElementTree so any namespace prefix (e.g. <x:mergeCell>) is handled.
+    '''
+    root = ET.fromstring(part)
+    merged_refs = [mc.get("ref") for mc in root.iter(f"{NS_MAIN}mergeCell")]
+
+    string_indices = []
+    max_row = 0
+    max_col = 0
+    for row_number, row in enumerate(root.iter(f"{NS_MAIN}row"), start=1):
+        # r attributes are optional, without them rows and cells follow one another.
+        row_number = int(row.get("r", row_number))
+        col = 0
+        for cell in row.iter(f"{NS_MAIN}c"):
+            ref = cell.get("r")
+            col = column_index_from_string(coordinate_from_string(ref)[0]) if ref else col + 1
+            max_row = max(max_row, row_number)
+            max_col = max(max_col, col)
+
+            if cell.get("t") == "s":
+                value = cell.find(f"{NS_MAIN}v")
+                if value is not None and value.text:
+                    string_indices.append(int(value.text))
+
+    return merged_refs, string_indices, max_row, max_col
+
+
+def sheet_fingerprint(part, merged_refs, string_indices, shared_strings):
+    '''
+    Hash a sheet part together with its merged ranges and the shared strings it references,
+    so a string edited only in sharedStrings.xml still marks the sheet as changed.
+    '''
+    digest = hashlib.sha256(part)
+    for ref in merged_refs:
+        digest.update(b"merge:" + ref.encode("ascii"))
+    for i in string_indices:
+        value = shared_strings[i] if i < len(shared_strings) else ""
+        digest.update(value.encode("utf-8") + b"\x00")
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest_path, manifest):
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
 def process_city(city: str, xlsx_path: str):
     if not os.path.exists(xlsx_path):
         print(f"File not found for {city}: {xlsx_path}")
         return
 
-    wb = openpyxl.load_workbook(xlsx_path, data_only=True)
-    sheet_names = wb.sheetnames
+    parts, shared_strings = read_sheet_parts(xlsx_path)
+    sheet_names = list(parts)
 
     output_folder = os.path.join(BASE_DIR, "data", city, "extracted_data")
     os.makedirs(output_folder, exist_ok=True)
 
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    old_manifest = load_manifest(manifest_path)
+    manifest = {}
+    events = {"sheets_without_revenue": [], "sheets_unchanged": 0}
+
     print(f"\nProcessing {city.upper()} ({len(sheet_names)} sheets)...")
 
+    # Read-only mode parses a worksheet only when its rows are iterated,
+    # so unchanged sheets are never touched by openpyxl.
+    wb = openpyxl.load_workbook(xlsx_path, data_only=True, read_only=True)
+
     for sheet_name in sheet_names:
+        merged_refs, string_indices, max_row, max_col = parse_sheet_part(parts[sheet_name])
+        fingerprint = sheet_fingerprint(parts[sheet_name], merged_refs, string_indices, shared_strings)
+        safe_sheet_name = "".join(c if c.isalnum() or c in "_-" else "_" for c in sheet_name)
+        csv_file = os.path.join(output_folder, f"{safe_sheet_name}.csv")
+
+        previous = old_manifest.get(sheet_name)
+        if previous and previous["hash"] == fingerprint and (previous["csv"] is None or os.path.exists(csv_file)):
+            manifest[sheet_name] = previous
+            events["sheets_unchanged"] += 1
+            print(f"Unchanged, skipped: {sheet_name}")
+            continue
+
+        # Read-only mode sizes rows from <dimension>, pass the real bounds instead.
+        # An empty sheet yields no header row and is reported as missing Revenue.
         ws = wb[sheet_name]
-        headers = [cell.value for cell in next(ws.iter_rows(min_row=1, max_row=1))]
+        rows = ws.iter_rows(max_row=max_row, max_col=max_col) if max_row else iter(())
+        headers = [cell.value for cell in next(rows, ())]
 
         try:
             price_col_index = headers.index(price_col_name)
         except ValueError:
             print(f"'{price_col_name}' not found in sheet: {sheet_name}")
+            manifest[sheet_name] = {"hash": fingerprint, "csv": None}
+            events["sheets_without_revenue"].append(sheet_name)
             continue
 
+        # Read-only worksheets do not expose merged ranges, take them from the sheet part.
         merged_cells_to_replace = set()
-        for merged_range in ws.merged_cells.ranges:
+        for ref in merged_refs:
+            merged_range = CellRange(ref)
             if merged_range.min_col - 1 == price_col_index:
                 for row in range(merged_range.min_row + 1, merged_range.max_row + 1):
                     merged_cells_to_replace.add((row, merged_range.min_col))
 
         data = []
-        for i, row in enumerate(ws.iter_rows(min_row=2), start=2):
+        for i, row in enumerate(rows, start=2):
             row_data = []
             for j, cell in enumerate(row):
                 if j == price_col_index and (i, j + 1) in merged_cells_to_replace:
@@ -60,13 +190,16 @@ def process_city(city: str, xlsx_path: str):
         if col_name_info in df.columns:
             df[col_name_info] = df[col_name_info].replace(r'^\s*$', np.nan, regex=True).ffill()
 
-        safe_sheet_name = "".join(c if c.isalnum() or c in "_-" else "_" for c in sheet_name)
-        csv_file = os.path.join(output_folder, f"{safe_sheet_name}.csv")
-
-        df.to_csv(csv_file, index=False, encoding="utf-8")
+        write_csv(df, csv_file, encoding="utf-8")
+        record_stage(df, stage_name(csv_file))
+        manifest[sheet_name] = {"hash": fingerprint, "csv": os.path.basename(csv_file)}
         print(f"Saved: {csv_file}")
 
-    print(f"Conversion complete for {city.UPPER()}!")
+    wb.close()
+    save_manifest(manifest_path, manifest)
+    record_stage(pd.DataFrame(), stage_name(xlsx_path), events=events)
+
+    print(f"Conversion complete for {city.upper()}!")
 
 def main():
     for city, xlsx_path in original_files.items():
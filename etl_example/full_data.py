@@ -1,6 +1,10 @@
 import os
 import pandas as pd
 
+from csv_io import read_csv, write_csv
+from data_quality import record_stage, stage_name, value_table
+from data_cleaning_city1 import KNOWN_VALUES
+
 '''Merge cleaned CSV files from two cities into one dataset.
     Adds a 'city' column to each entry, cleans column names,
     handles price and escape time, and prepares data for further analysis.'''
@@ -18,11 +22,11 @@ def merge_city_data(city1_path, city2_path, output_path):
         print("One or both input files do not exist.")
         return
 
-    df1 = pd.read_csv(city1_path, dtype=str)
+    df1 = read_csv(city1_path)
     df1["city"] = "City1"
     df1.drop(columns=[col for col in drop_columns if col in df1.columns], inplace=True)
 
-    df2 = pd.read_csv(city2_path, dtype=str)
+    df2 = read_csv(city2_path)
     df2["city"] = "City2"
     df2.drop(columns=[col for col in drop_columns if col in df2.columns], inplace=True)
 
@@ -52,17 +56,26 @@ def merge_city_data(city1_path, city2_path, output_path):
     if "EscapeTime" in merged_df.columns:
         merged_df["EscapeTime"] = merged_df["EscapeTime"].replace("-", pd.NA)
 
+    events = {}
     if "Source" in merged_df.columns:
         merged_df["Source"] = merged_df["Source"].fillna("").str.strip().str.upper()
         counts = merged_df["Source"].value_counts()
         rare = counts[counts < 20].index
+        events["rare_or_blank_source_rows"] = int((merged_df["Source"].isin(rare) | (merged_df["Source"] == "")).sum())
         merged_df.loc[merged_df["Source"].isin(rare), "Source"] = "ONLINE"
         merged_df.loc[merged_df["Source"] == "", "Source"] = "ONLINE"
 
     merged_df.drop_duplicates(inplace=True)
 
+    # KNOWN_VALUES lists City1 rooms only, City2 rooms would all show up as unmapped.
+    if "Room Type" in merged_df.columns:
+        rooms = merged_df.loc[merged_df["city"] == "City1", "Room Type"].dropna()
+        unknown = rooms[~rooms.isin(list(KNOWN_VALUES["Room Type"]))]
+        events["unmapped_city1_rooms"] = {"rows": int(len(unknown)), "top": value_table(unknown)}
+
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    merged_df.to_csv(output_path, index=False)
+    write_csv(merged_df, output_path)
+    record_stage(merged_df, stage_name(output_path), known_values={"Source": KNOWN_VALUES["Source"]}, events=events)
     print(f"Merged data saved to: {output_path}")
 
 
@@ -0,0 +1,218 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from csv_io import read_csv
+from data_cleaning_city1 import CASUAL_TIMES, EARLY_SLOT, round_to_casual_time
+from temporal import parse_dates, parse_times, minutes_to_time, map_unique
+
+'''Build a dense room x day x slot occupancy cube from the merged dataset.
+
+- Rooms are indexed as "City|Room" so both cities share one cube
+- Days cover every calendar day between the first and last booking
+- Slots are the casual time slots produced by round_to_casual_time, off-slot times are snapped to them
+- Stores booking counts, revenue and mean escape time as .npy arrays, loaded memory-mapped
+- Occupancy rates, heatmaps and YTD comparisons become array slices instead of group-bys'''
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SLOTS = [EARLY_SLOT] + CASUAL_TIMES
+
+# Column names differ between pipeline outputs, first match wins.
+COLUMN_CANDIDATES = {
+    "date": ["Date", "Data"],
+    "time": ["Time"],
+    "room": ["Room Type", "Room type"],
+    "city": ["city", "City"],
+    "revenue": ["Price", "Revenue"],
+    "escape": ["EscapeTime", "Escape Time"],
+}
+
+ARRAYS = ["bookings", "revenue", "escape_mean"]
+
+
+def find_column(df, key):
+    for col in COLUMN_CANDIDATES[key]:
+        if col in df.columns:
+            return col
+    return None
+
+
+def to_slot(times):
+    '''
+    Map time strings to slot labels, snapping off-slot times with round_to_casual_time.
+    Only unique values are parsed and rounded; unparseable times become NaN.
+    '''
+    minutes = parse_times(times)
+    return map_unique(minutes, lambda m: round_to_casual_time(minutes_to_time(m)))
+
+
+def build_cube(df):
+    '''
+    Aggregate row-level bookings into dense arrays of shape (rooms, days, slots).
+    Returns (arrays, index) where index holds the axis labels, or None when no row is usable.
+    '''
+    cols = {key: find_column(df, key) for key in COLUMN_CANDIDATES}
+    missing = [key for key in ["date", "time", "room"] if cols[key] is None]
+    if missing:
+        raise KeyError(f"Missing required columns for occupancy cube: {missing}")
+
+    dates = parse_dates(df[cols["date"]]).dt.normalize()
+    slot_idx = pd.Categorical(to_slot(df[cols["time"]]), categories=SLOTS).codes
+
+    city = df[cols["city"]].fillna("") if cols["city"] else pd.Series("", index=df.index)
+    room_labels = city.astype(str) + "|" + df[cols["room"]].fillna("").astype(str).str.strip()
+
+    valid = dates.notna().to_numpy() & (slot_idx >= 0) & df[cols["room"]].notna().to_numpy()
+    bad = int((~valid).sum())
+    if bad:
+        print(f"Skipping {bad} rows with invalid date, time slot or room")
+    if not valid.any():
+        print("No rows with a valid date, time slot and room, occupancy cube not built")
+        return None
+
+    dates = dates[valid]
+    slot_idx = slot_idx[valid]
+    room_idx, rooms = pd.factorize(room_labels[valid], sort=True)
+
+    start = dates.min()
+    end = dates.max()
+    n_days = (end - start).days + 1
+    day_idx = (dates - start).dt.days.to_numpy()
+
+    shape = (len(rooms), n_days, len(SLOTS))
+    flat = np.ravel_multi_index((room_idx, day_idx, slot_idx), shape)
+    size = int(np.prod(shape))
+
+    bookings = np.bincount(flat, minlength=size).astype(np.int32)
+
+    if cols["revenue"]:
+        revenue = pd.to_numeric(
+            df.loc[valid, cols["revenue"]].astype(str).str.replace("E", "", regex=False).str.strip(),
+            errors="coerce",
+        ).fillna(0).to_numpy()
+    else:
+        revenue = np.zeros(len(flat))
+    revenue = np.bincount(flat, weights=revenue, minlength=size)
+
+    escape_mean = np.full(size, np.nan, dtype=np.float32)
+    if cols["escape"]:
+        escape = pd.to_numeric(df.loc[valid, cols["escape"]], errors="coerce").to_numpy()
+        has_escape = ~np.isnan(escape)
+        escape_sum = np.bincount(flat[has_escape], weights=escape[has_escape], minlength=size)
+        escape_count = np.bincount(flat[has_escape], minlength=size)
+        np.divide(escape_sum, escape_count, out=escape_mean, where=escape_count > 0, casting="unsafe")
+
+    arrays = {
+        "bookings": bookings.reshape(shape),
+        "revenue": revenue.reshape(shape),
+        "escape_mean": escape_mean.reshape(shape),
+    }
+    index = {
+        "rooms": list(rooms),
+        "start_date": start.strftime("%Y-%m-%d"),
+        "days": n_days,
+        "slots": SLOTS,
+    }
+    return arrays, index
+
+
+def save_cube(arrays, index, cube_dir):
+    '''Save each array as .npy plus index.json with the axis labels.'''
+    os.makedirs(cube_dir, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(cube_dir, f"{name}.npy"), arrays[name])
+    with open(os.path.join(cube_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    print(f"Occupancy cube saved to: {cube_dir}")
+
+
+class OccupancyCube:
+    '''Memory-mapped view over a saved cube with label-based slicing helpers.'''
+
+    def __init__(self, cube_dir):
+        with open(os.path.join(cube_dir, "index.json"), encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.rooms = self.index["rooms"]
+        self.slots = self.index["slots"]
+        self.start_date = pd.Timestamp(self.index["start_date"])
+        self.dates = pd.date_range(self.start_date, periods=self.index["days"], freq="D")
+
+        self.bookings = np.load(os.path.join(cube_dir, "bookings.npy"), mmap_mode="r")
+        self.revenue = np.load(os.path.join(cube_dir, "revenue.npy"), mmap_mode="r")
+        self.escape_mean = np.load(os.path.join(cube_dir, "escape_mean.npy"), mmap_mode="r")
+
+    def room_index(self, city, room):
+        return self.rooms.index(f"{city}|{room}")
+
+    def day_slice(self, start=None, end=None):
+        '''Convert an inclusive date range to a slice on the day axis.'''
+        first = 0 if start is None else max((pd.Timestamp(start) - self.start_date).days, 0)
+        last = len(self.dates) if end is None else (pd.Timestamp(end) - self.start_date).days + 1
+        return slice(first, max(last, first))
+
+    def occupancy_rate(self, start=None, end=None):
+        '''Share of slots with at least one booking, per room, as {"City|Room": rate}.'''
+        booked = self.bookings[:, self.day_slice(start, end), :] > 0
+        rates = booked.mean(axis=(1, 2)) if booked.size else np.zeros(len(self.rooms))
+        return dict(zip(self.rooms, rates.round(4).tolist()))
+
+    def slot_heatmap(self, city, room, start=None, end=None):
+        '''Booking counts for one room as a weekday x slot DataFrame.'''
+        days = self.day_slice(start, end)
+        counts = np.asarray(self.bookings[self.room_index(city, room), days, :])
+        weekdays = self.dates[days].dayofweek.to_numpy()
+        heatmap = np.zeros((7, len(self.slots)), dtype=np.int64)
+        np.add.at(heatmap, weekdays, counts)
+        return pd.DataFrame(heatmap, index=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], columns=self.slots)
+
+    def ytd_comparison(self, year, as_of=None):
+        '''
+        Bookings and revenue per room from 1 January to as_of (default: last day in the cube)
+        for the given year and the previous year over the same period.
+        '''
+        as_of = pd.Timestamp(as_of) if as_of is not None else self.dates[-1]
+        rows = []
+        for y in [year - 1, year]:
+            start = pd.Timestamp(year=y, month=1, day=1)
+            try:
+                end = as_of.replace(year=y)
+            except ValueError:
+                end = as_of.replace(year=y, day=28)
+            days = self.day_slice(start, end)
+            rows.append(pd.DataFrame({
+                "Year": y,
+                "Room": self.rooms,
+                "Bookings": self.bookings[:, days, :].sum(axis=(1, 2)),
+                "Revenue": self.revenue[:, days, :].sum(axis=(1, 2)),
+            }))
+        return pd.concat(rows, ignore_index=True)
+
+
+def build_cube_from_csv(input_path, cube_dir):
+    '''Load the merged dataset and save its occupancy cube.'''
+    if not os.path.exists(input_path):
+        print(f"Missing file: {input_path}")
+        return
+
+    df = read_csv(input_path)
+    if df.empty:
+        print(f"Empty file: {input_path}")
+        return
+
+    cube = build_cube(df)
+    if cube is None:
+        return
+
+    arrays, index = cube
+    save_cube(arrays, index, cube_dir)
+    print(f"Rooms: {len(index['rooms'])}, days: {index['days']}, slots: {len(index['slots'])}")
+
+
+if __name__ == "__main__":
+    input_file = os.path.join(BASE_DIR, "data", "escape_rooms_2019_2025.csv")
+    cube_dir = os.path.join(BASE_DIR, "data", "occupancy_cube")
+
+    build_cube_from_csv(input_file, cube_dir)
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import random
+
+import numpy as np
+
+from query_service import QueryService, DEFAULT_DATASET, BASE_DIR
+
+'''Load test for the query service: latency of typical dashboard queries.
+
+- Runs a fixed set of dashboard-style queries in random order against QueryService
+- Reports p50/p95/max latency for cold (cache miss) and warm (cache hit) runs
+- Usage: python query_load_test.py [dataset.csv] [iterations]'''
+
+
+def dashboard_queries(service):
+    '''Typical dashboard questions, built from the years and cities present in the dataset.'''
+    df = service.df
+    years = sorted(int(y) for y in df["Year"].dropna().unique()) if "Year" in df.columns else []
+    last_year = years[-1] if years else None
+    cities = list(df["city"].dropna().unique()) if "city" in df.columns else [None]
+
+    queries = [
+        {"group_by": "Room Type", "metric": "count"},
+        {"group_by": ["city", "Year"], "metric": "count"},
+        {"group_by": "Month", "metric": "sum", "value": "Price"},
+        {"group_by": "Admin", "metric": "count", "top_n": 5},
+        {"group_by": "Source", "metric": "count"},
+    ]
+    for city in cities:
+        queries.append({"city": city, "group_by": "TeamType", "metric": "count"})
+        queries.append({"city": city, "group_by": "Room Type", "metric": "mean", "value": "EscapeTime"})
+        if last_year:
+            queries.append({
+                "city": city,
+                "date_from": f"{last_year}-01-01",
+                "date_to": f"{last_year}-12-31",
+                "group_by": "TeamType",
+                "metric": "count",
+            })
+    if last_year:
+        queries.append({
+            "date_from": f"{last_year}-10-01",
+            "date_to": f"{last_year}-10-31",
+            "group_by": "Admin",
+            "metric": "count",
+            "top_n": 10,
+        })
+
+    # Drop queries referring to columns this dataset does not have.
+    columns = set(df.columns)
+    valid = []
+    for q in queries:
+        needed = set([q["group_by"]] if isinstance(q["group_by"], str) else q["group_by"])
+        if q.get("value"):
+            needed.add(q["value"])
+        if "city" in q:
+            needed.add("city")
+        if needed <= columns:
+            valid.append(q)
+    return valid
+
+
+def percentiles(latencies):
+    ms = np.array(latencies) * 1000
+    return {
+        "n": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def run_load_test(path, iterations=200, seed=0):
+    service = QueryService(path)
+    queries = dashboard_queries(service)
+    rng = random.Random(seed)
+
+    cold = []
+    warm = []
+    for i in range(iterations):
+        q = rng.choice(queries)
+        # Every tenth round starts from an empty cache to measure uncached latency too.
+        if i % 10 == 0:
+            service.cache.clear()
+        misses = service.misses
+        start = time.perf_counter()
+        service.query(**q)
+        elapsed = time.perf_counter() - start
+        (cold if service.misses > misses else warm).append(elapsed)
+
+    print(f"Dataset: {path} ({len(service.df)} rows), {len(queries)} distinct queries, {iterations} runs")
+    for name, latencies in [("cold", cold), ("warm", warm), ("all", cold + warm)]:
+        if latencies:
+            print(f"{name:>5}: {percentiles(latencies)}")
+    print(f"Cache hits: {service.hits}, misses: {service.misses}")
+
+
+if __name__ == "__main__":
+    dataset = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DATASET
+    if not os.path.exists(dataset):
+        dataset = os.path.join(BASE_DIR, "data", "full_data.csv")
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    run_load_test(dataset, runs)
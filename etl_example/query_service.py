@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from csv_io import read_csv
+from temporal import parse_dates
+from occupancy_cube import COLUMN_CANDIDATES, find_column
+
+'''Read-only query service over the merged dataset from full_data.merge_city_data.
+
+- Loads the CSV once into a compact columnar frame (categorical text, typed dates and numbers)
+- Answers parameterized aggregates: filters on city/room/date/any column, group-bys, top-N
+- Keeps an LRU cache of results, cleared when the pipeline publishes a new output file
+- Exposed as a Python API (QueryService) and a small local JSON HTTP server'''
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATASET = os.path.join(BASE_DIR, "data", "escape_rooms_2019_2025.csv")
+
+CACHE_SIZE = 256
+METRICS = ["count", "sum", "mean"]
+
+# Metrics whose group values add up to a meaningful total get a 'share' column.
+ADDITIVE_METRICS = ["count", "sum"]
+
+# Text columns with fewer unique values than this share of rows are stored as categories.
+CATEGORY_MAX_RATIO = 0.5
+
+
+def load_dataset(path):
+    '''
+    Load the merged CSV into a compact frame. Known columns are renamed to one canonical name
+    (Date, Room Type, city, Price, EscapeTime), Year and Month are added for group-bys.
+    '''
+    df = read_csv(path)
+
+    renames = {}
+    for key, candidates in COLUMN_CANDIDATES.items():
+        col = find_column(df, key)
+        if col and col != candidates[0]:
+            renames[col] = candidates[0]
+    df = df.rename(columns=renames)
+
+    for key in ["revenue", "escape"]:
+        col = COLUMN_CANDIDATES[key][0]
+        if col in df.columns:
+            values = df[col].astype("string").str.replace("E", "", regex=False).str.strip()
+            df[col] = pd.to_numeric(values, errors="coerce")
+
+    if "Date" in df.columns:
+        df["Date"] = parse_dates(df["Date"]).dt.normalize()
+        df["Year"] = df["Date"].dt.year.astype("Int16")
+        df["Month"] = df["Date"].dt.strftime("%Y-%m").astype("category")
+
+    for col in df.columns:
+        if df[col].dtype == object and df[col].nunique() <= max(len(df) * CATEGORY_MAX_RATIO, 1):
+            df[col] = df[col].astype("category")
+
+    return df
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def _cache_key(**params):
+    key = []
+    for name in sorted(params):
+        value = params[name]
+        if isinstance(value, dict):
+            value = tuple(sorted((k, tuple(_as_list(v))) for k, v in value.items()))
+        elif isinstance(value, (list, tuple, set)):
+            value = tuple(value)
+        key.append((name, value))
+    return tuple(key)
+
+
+class QueryService:
+    '''Keeps one dataset in memory and answers cached aggregate queries over it.'''
+
+    def __init__(self, path=DEFAULT_DATASET, cache_size=CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+        self.version = None
+        self.df = None
+        self.refresh()
+
+    def _file_version(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self):
+        '''
+        Reload the dataset and clear the cache if the published file changed.
+        While the file is missing or unreadable the loaded frame keeps being served.
+        '''
+        try:
+            if self._file_version() == self.version:
+                return False
+
+            # Only one thread reloads; the others wait and then see the new version.
+            with self.reload_lock:
+                version = self._file_version()
+                if version == self.version:
+                    return False
+                df = load_dataset(self.path)
+                with self.lock:
+                    self.df = df
+                    self.version = version
+                    self.cache.clear()
+        except OSError as e:
+            if self.df is None:
+                raise
+            print(f"Could not reload {self.path} ({e}), serving the loaded data")
+            return False
+
+        print(f"Loaded {len(df)} rows from {self.path}")
+        return True
+
+    def query(self, city=None, room=None, date_from=None, date_to=None, where=None,
+              group_by=None, metric="count", value=None, top_n=None):
+        '''
+        Filter rows, group and aggregate. Returns a DataFrame sorted by the metric (descending).
+        For count and sum a 'share' column holds each group's fraction of the total.
+
+        city, room: one value or a list of values
+        date_from, date_to: inclusive date bounds
+        where: {column: value or list of values} for any other column (e.g. TeamType, Admin)
+        group_by: column or list of columns (Year and Month are available)
+        metric: count, sum or mean of the value column (value must be numeric)
+        '''
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric: {metric}. Expected one of {METRICS}")
+        if metric != "count" and value is None:
+            raise ValueError(f"Metric '{metric}' needs a value column")
+
+        self.refresh()
+
+        key = _cache_key(
+            city=city, room=room, date_from=date_from, date_to=date_to, where=where,
+            group_by=_as_list(group_by), metric=metric, value=value, top_n=top_n,
+        )
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key].copy()
+            self.misses += 1
+            df = self.df
+            version = self.version
+
+        result = self._run(df, city, room, date_from, date_to, where, _as_list(group_by), metric, value, top_n)
+
+        with self.lock:
+            # A reload during the computation means this result belongs to the old file.
+            if version == self.version:
+                self.cache[key] = result
+                if len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return result.copy()
+
+    def _run(self, df, city, room, date_from, date_to, where, group_by, metric, value, top_n):
+        if value is not None:
+            if value not in df.columns:
+                raise KeyError(f"Unknown column: {value}")
+            if not pd.api.types.is_numeric_dtype(df[value]):
+                raise ValueError(f"Column '{value}' is not numeric, cannot compute {metric}")
+
+        mask = pd.Series(True, index=df.index)
+
+        filters = dict(where or {})
+        if city is not None:
+            filters["city"] = city
+        if room is not None:
+            filters["Room Type"] = room
+        for col, wanted in filters.items():
+            if col not in df.columns:
+                raise KeyError(f"Unknown column: {col}")
+            wanted = _as_list(wanted)
+            if pd.api.types.is_numeric_dtype(df[col]):
+                wanted = pd.to_numeric(pd.Series(wanted), errors="coerce").dropna().tolist()
+            mask &= df[col].isin(wanted).to_numpy()
+
+        if date_from is not None:
+            mask &= (df["Date"] >= pd.Timestamp(date_from)).to_numpy()
+        if date_to is not None:
+            mask &= (df["Date"] <= pd.Timestamp(date_to)).to_numpy()
+
+        rows = df[mask.to_numpy()]
+
+        if metric == "count":
+            series = rows.groupby(group_by, observed=True).size() if group_by else pd.Series([len(rows)])
+        else:
+            grouped = rows.groupby(group_by, observed=True)[value] if group_by else rows[value]
+            series = getattr(grouped, metric)()
+            if not group_by:
+                series = pd.Series([series])
+
+        result = series.rename(metric).reset_index() if group_by else series.rename(metric).to_frame()
+        if metric in ADDITIVE_METRICS:
+            total = result[metric].sum()
+            result["share"] = (result[metric] / total).round(4) if total else 0.0
+        result = result.sort_values(metric, ascending=False, ignore_index=True)
+
+        if top_n is not None:
+            result = result.head(int(top_n))
+        return result
+
+
+def make_handler(service):
+    '''Build a request handler answering GET /query?... with JSON records.'''
+
+    params_fixed = {"city", "room", "date_from", "date_to", "group_by", "metric", "value", "top"}
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/query":
+                self._send(404, {"error": f"Unknown path: {url.path}"})
+                return
+
+            params = parse_qs(url.query)
+
+            def single(name):
+                return params[name][0] if name in params else None
+
+            try:
+                result = service.query(
+                    city=params.get("city"),
+                    room=params.get("room"),
+                    date_from=single("date_from"),
+                    date_to=single("date_to"),
+                    where={k: v for k, v in params.items() if k not in params_fixed} or None,
+                    group_by=single("group_by").split(",") if "group_by" in params else None,
+                    metric=single("metric") or "count",
+                    value=single("value"),
+                    top_n=single("top"),
+                )
+            except (KeyError, ValueError, TypeError) as e:
+                self._send(400, {"error": str(e)})
+                return
+
+            self._send(200, json.loads(result.to_json(orient="records", date_format="iso")))
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+
+def serve(path=DEFAULT_DATASET, host="127.0.0.1", port=8765):
+    service = QueryService(path)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Query service on http://{host}:{port}/query")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    dataset = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DATASET
+    serve(dataset)
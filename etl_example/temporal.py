@@ -0,0 +1,111 @@
+from datetime import time
+
+import pandas as pd
+
+'''Shared Date/Time parsing for the pipeline stages.
+
+- Detects the date format once per file from a sample instead of inferring per element
+- Parses only unique strings and maps the results back (dates repeat heavily within a year)
+- Dates come back as datetime64, times as minute of day (seconds kept as the fraction)
+- Later stages keep these typed columns instead of re-stringifying with strftime'''
+
+
+# Ties keep the earlier format, so month-first comes before day-first: when every day in a
+# file is <= 12 both parse, and pd.to_datetime without a format read such dates month-first.
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%Y.%m.%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m.%d.%Y",
+    "%d.%m.%Y",
+]
+
+TIME_FORMATS = ["%H:%M:%S", "%H:%M"]
+
+SAMPLE_SIZE = 200
+MIN_FORMAT_MATCH = 0.9
+
+
+def map_unique(series, func):
+    '''Apply func to each unique non-null value of series only once and map the results back.'''
+    codes, uniques = pd.factorize(series)
+    results = pd.Series([func(value) for value in uniques], dtype=object)
+    mapped = results.reindex(codes).to_numpy()
+    return pd.Series(mapped, index=series.index, name=series.name)
+
+
+def detect_date_format(values, formats=DATE_FORMATS, sample_size=SAMPLE_SIZE):
+    '''
+    Return the format from formats that parses the largest share of a sample of values,
+    or None when no format parses at least MIN_FORMAT_MATCH of it.
+    '''
+    sample = pd.Series(values).dropna().astype(str).str.strip()
+    sample = sample[sample != ""].drop_duplicates().head(sample_size)
+    if sample.empty:
+        return None
+
+    best_format = None
+    best_ratio = 0.0
+    for fmt in formats:
+        ratio = pd.to_datetime(sample, format=fmt, errors="coerce").notna().mean()
+        if ratio > best_ratio:
+            best_format, best_ratio = fmt, ratio
+
+    return best_format if best_ratio >= MIN_FORMAT_MATCH else None
+
+
+def parse_dates(series, date_format=None):
+    '''
+    Parse a string Series into datetime64, invalid values become NaT.
+    The format is detected once from a sample unless given; only unique strings are parsed.
+    '''
+    values = series.astype("string").str.strip()
+    codes, uniques = pd.factorize(values)
+
+    if date_format is None:
+        date_format = detect_date_format(uniques)
+
+    if date_format is not None:
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=date_format, errors="coerce")
+    else:
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce")
+
+    result = pd.Series(pd.NaT, index=series.index, name=series.name, dtype="datetime64[ns]")
+    found = codes >= 0
+    result[found] = parsed.to_numpy()[codes[found]]
+    return result
+
+
+def parse_times(series, formats=TIME_FORMATS):
+    '''
+    Parse 'HH:MM:SS' or 'HH:MM' strings into minute of day (nullable Float64), seconds kept
+    as the fraction so rounding to slots matches the full time. Each unique string is tried
+    against formats in order; invalid values become <NA>.
+    '''
+    values = series.astype("string").str.strip()
+    codes, uniques = pd.factorize(values)
+
+    uniques = pd.Series(uniques, dtype=object)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+    for fmt in formats:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(uniques[missing], format=fmt, errors="coerce")
+
+    minutes = (parsed.dt.hour * 60 + parsed.dt.minute + parsed.dt.second / 60).astype("Float64").to_numpy()
+    result = pd.Series(pd.NA, index=series.index, name=series.name, dtype="Float64")
+    found = codes >= 0
+    result[found] = minutes[codes[found]]
+    return result
+
+
+def minutes_to_time(minutes):
+    '''Convert minute of day (fraction = seconds) to datetime.time, None for missing values.'''
+    if pd.isna(minutes):
+        return None
+    seconds = int(round(float(minutes) * 60))
+    return time(seconds // 3600, seconds // 60 % 60, seconds % 60)